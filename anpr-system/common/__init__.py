@@ -0,0 +1 @@
+"""Code shared between the ANPR pipeline services."""
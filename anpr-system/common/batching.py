@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any, Callable, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+class InferenceScheduler:
+    """Batches inputs from concurrently delivered messages into full inference batches
+
+    Batches run on a single dedicated inference thread so the event loop keeps
+    servicing the connection. At most max_queued batches are handed to that
+    thread at once; while it is busy, new frames keep accumulating into the
+    next batch.
+    """
+
+    def __init__(self, infer: Callable[[List[Any]], List[Any]], batch_size: int,
+                 max_wait: float, max_queued: int = 2):
+        self.infer = infer
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.pending: List[Tuple[Any, asyncio.Future, float]] = []  # (frame, result, enqueued at)
+        self.frames_available = asyncio.Event()
+        self.batch_full = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.queued = asyncio.Semaphore(max_queued)
+        self.running: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.total_batches = 0
+        self.total_batched_frames = 0
+
+    async def submit(self, frames: List[Any]) -> List[Any]:
+        """Queue frames for inference and wait for their results, in order"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        now = loop.time()
+        for frame in frames:
+            future = loop.create_future()
+            self.pending.append((frame, future, now))
+            futures.append(future)
+        self.frames_available.set()
+        if len(self.pending) >= self.batch_size:
+            self.batch_full.set()
+        return await asyncio.gather(*futures)
+
+    async def run(self) -> None:
+        """Dispatch a batch once it is full or its oldest frame hits the deadline"""
+        while True:
+            await self.queued.acquire()
+            await self.frames_available.wait()
+            if len(self.pending) < self.batch_size:
+                # The deadline runs from the oldest frame's arrival, not from when
+                # the dispatcher got round to it after waiting for a free slot
+                waited = asyncio.get_running_loop().time() - self.pending[0][2]
+                try:
+                    await asyncio.wait_for(self.batch_full.wait(), max(0.0, self.max_wait - waited))
+                except asyncio.TimeoutError:
+                    pass
+
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            if len(self.pending) < self.batch_size:
+                self.batch_full.clear()
+            if not self.pending:
+                self.frames_available.clear()
+
+            task = asyncio.create_task(self.execute(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def execute(self, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        """Run one batch on the inference thread and resolve its futures"""
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.infer, [frame for frame, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.queued.release()
+
+        self.total_batches += 1
+        self.total_batched_frames += len(batch)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.total_batched_frames / self.total_batches if self.total_batches else 0.0
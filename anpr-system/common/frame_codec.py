@@ -0,0 +1,118 @@
+import json
+import struct
+import hashlib
+from typing import List, Optional, Union
+from dataclasses import dataclass, field
+
+# Binary frame batch envelope (all integers big-endian):
+#
+#   header   magic "ANPF" | version u8 | flags u8 | reserved u16
+#            | batch timestamp f64 | frame count u32 | stream url length u16
+#   url      utf-8 encoded stream url
+#   frames   frame count x (capture timestamp f64 | body length u32 | body)
+#
+# Bodies are raw JPEG bytes. Consumers slice them out of the message body as
+# memoryviews so no frame is copied until it is handed to the decoder.
+MAGIC = b"ANPF"
+VERSION = 1
+CONTENT_TYPE = "application/x-anpr-frames"
+JSON_CONTENT_TYPE = "application/json"
+
+_HEADER = struct.Struct("!4sBBHdIH")
+_FRAME = struct.Struct("!dI")
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+class FrameCodecError(Exception):
+    """Raised when a frame batch cannot be encoded or decoded"""
+    pass
+
+@dataclass
+class FrameBatch:
+    stream_url: str
+    timestamp: float
+    frames: List[BytesLike] = field(default_factory=list)
+    frame_timestamps: List[float] = field(default_factory=list)
+
+def encode_frame_batch(
+    frames: List[bytes],
+    stream_url: str,
+    timestamp: float,
+    frame_timestamps: Optional[List[float]] = None
+) -> bytes:
+    """Pack a batch of JPEG frames into the binary envelope"""
+    if frame_timestamps is None:
+        frame_timestamps = [timestamp] * len(frames)
+    if len(frame_timestamps) != len(frames):
+        raise FrameCodecError("One capture timestamp is required per frame")
+
+    url = stream_url.encode("utf-8")
+    if len(url) > 0xFFFF:
+        raise FrameCodecError("Stream URL too long for frame envelope")
+
+    parts = [_HEADER.pack(MAGIC, VERSION, 0, 0, timestamp, len(frames), len(url)), url]
+    for frame, frame_ts in zip(frames, frame_timestamps):
+        parts.append(_FRAME.pack(frame_ts, len(frame)))
+        parts.append(frame)
+    return b"".join(parts)
+
+def camera_id(stream_url: str) -> str:
+    """Stable camera identifier for a stream without a name; stream URLs often embed credentials"""
+    return "cam-" + hashlib.sha1(stream_url.encode("utf-8")).hexdigest()[:12]
+
+def is_binary_batch(body: BytesLike) -> bool:
+    """Check whether a message body uses the binary envelope"""
+    return bytes(body[:len(MAGIC)]) == MAGIC
+
+def decode_frame_batch(body: BytesLike) -> FrameBatch:
+    """Unpack a binary envelope, returning frames as zero-copy memoryviews"""
+    view = memoryview(body)
+    try:
+        magic, version, _flags, _reserved, timestamp, count, url_len = _HEADER.unpack_from(view, 0)
+    except struct.error as e:
+        raise FrameCodecError(f"Truncated frame batch header: {str(e)}")
+
+    if magic != MAGIC:
+        raise FrameCodecError("Not a binary frame batch")
+    if version != VERSION:
+        raise FrameCodecError(f"Unsupported frame batch version: {version}")
+
+    offset = _HEADER.size
+    stream_url = bytes(view[offset:offset + url_len]).decode("utf-8")
+    offset += url_len
+
+    batch = FrameBatch(stream_url=stream_url, timestamp=timestamp)
+    for _ in range(count):
+        try:
+            frame_ts, length = _FRAME.unpack_from(view, offset)
+        except struct.error as e:
+            raise FrameCodecError(f"Truncated frame header: {str(e)}")
+        offset += _FRAME.size
+        if offset + length > len(view):
+            raise FrameCodecError("Truncated frame body")
+        batch.frames.append(view[offset:offset + length])
+        batch.frame_timestamps.append(frame_ts)
+        offset += length
+
+    return batch
+
+def decode_json_batch(body: BytesLike) -> FrameBatch:
+    """Unpack the legacy hex-in-JSON format"""
+    data = json.loads(bytes(body))
+    timestamp = data.get("timestamp")
+    try:
+        frames = [bytes.fromhex(frame) for frame in data.get("frames", [])]
+    except ValueError as e:
+        raise FrameCodecError(f"Invalid hex frame in JSON batch: {str(e)}")
+    return FrameBatch(
+        stream_url=data.get("stream_url"),
+        timestamp=timestamp,
+        frames=frames,
+        frame_timestamps=[timestamp] * len(frames)
+    )
+
+def decode_any_batch(body: BytesLike) -> FrameBatch:
+    """Decode either wire format, sniffing the envelope magic"""
+    if is_binary_batch(body):
+        return decode_frame_batch(body)
+    return decode_json_batch(body)
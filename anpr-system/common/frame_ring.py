@@ -0,0 +1,161 @@
+import os
+import shutil
+import struct
+import threading
+import time
+from typing import Any, Dict, Tuple
+from dataclasses import dataclass, asdict
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+# Shared-memory ring of raw frames for co-located ingestion and detection.
+#
+#   header   magic "ANPR" | version u32 | slot count u32 | slot bytes u64 | ring id u64
+#   slots    slot count x (slot header | slot bytes of pixel data)
+#
+# The ring id is drawn at random each time a writer creates the ring. A
+# restarted writer recreates the segment under the same name, so descriptors
+# carry the id and readers re-attach when it no longer matches the segment
+# they have mapped.
+#
+# A slot header holds the sequence number of the frame it contains plus its
+# shape and capture timestamp. The writer zeroes the sequence number before
+# overwriting pixels and publishes the new one afterwards, so a reader that
+# sees the expected sequence number both before and after copying a frame
+# knows the slot was not recycled underneath it.
+MAGIC = b"ANPR"
+VERSION = 2
+REF_CONTENT_TYPE = "application/x-anpr-frame-refs"
+SHM_DIR = "/dev/shm"
+
+_HEADER = struct.Struct("<4sIIQQ")
+_SLOT = struct.Struct("<QIII4xd")
+
+class FrameRingError(Exception):
+    """Raised when the frame ring cannot be created, attached or written"""
+    pass
+
+class FrameOverwrittenError(FrameRingError):
+    """Raised when a frame slot was recycled before the reader got to it"""
+    pass
+
+@dataclass
+class FrameRef:
+    ring: str
+    ring_id: int
+    slot: int
+    seq: int
+    shape: Tuple[int, int, int]
+    timestamp: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FrameRef":
+        return cls(
+            ring=data["ring"],
+            ring_id=int(data["ring_id"]),
+            slot=int(data["slot"]),
+            seq=int(data["seq"]),
+            shape=tuple(data["shape"]),
+            timestamp=float(data["timestamp"])
+        )
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, ring_id: int, slots: int, slot_bytes: int,
+                 owner: bool):
+        self.shm = shm
+        self.name = shm.name
+        self.ring_id = ring_id
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = owner
+        self.stride = _SLOT.size + slot_bytes
+        # Microseconds since the epoch, so sequence numbers keep increasing across writer restarts
+        self.next_seq = time.time_ns() // 1000
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, name: str, slots: int, slot_bytes: int) -> "FrameRing":
+        """Create (or recreate) a ring owned by this process"""
+        size = _HEADER.size + slots * (_SLOT.size + slot_bytes)
+        try:
+            # Left behind by a previous writer; readers notice the new ring id and re-attach
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        if os.path.isdir(SHM_DIR):
+            # The segment is allocated lazily, so an undersized /dev/shm only shows up as SIGBUS on write
+            free = shutil.disk_usage(SHM_DIR).free
+            if free < size:
+                raise FrameRingError(f"Frame ring needs {size} bytes but {SHM_DIR} has only {free} free")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        ring_id = int.from_bytes(os.urandom(8), "little")
+        _HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, slots, slot_bytes, ring_id)
+        return cls(shm, ring_id, slots, slot_bytes, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        """Attach to a ring created by another process"""
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            raise FrameRingError(f"Frame ring not found: {name}")
+        # The creator owns the segment; keep the resource tracker from unlinking it when we exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+        magic, version, slots, slot_bytes, ring_id = _HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            shm.close()
+            raise FrameRingError(f"Incompatible frame ring: {name}")
+        return cls(shm, ring_id, slots, slot_bytes, owner=False)
+
+    def slot_offset(self, slot: int) -> int:
+        return _HEADER.size + slot * self.stride
+
+    def write(self, frame: np.ndarray, timestamp: float) -> FrameRef:
+        """Copy a frame into the next slot and return its descriptor"""
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            raise FrameRingError(
+                f"Frame of {frame.nbytes} bytes ({frame.dtype}) does not fit a {self.slot_bytes} byte slot"
+            )
+
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+
+        slot = seq % self.slots
+        offset = self.slot_offset(slot)
+        height, width, channels = frame.shape
+        # Invalidate the slot while its pixels are being replaced
+        _SLOT.pack_into(self.shm.buf, offset, 0, 0, 0, 0, 0.0)
+        pixels = np.ndarray(frame.shape, np.uint8, self.shm.buf, offset + _SLOT.size)
+        pixels[...] = frame
+        _SLOT.pack_into(self.shm.buf, offset, seq, height, width, channels, timestamp)
+        return FrameRef(self.name, self.ring_id, slot, seq, (height, width, channels), timestamp)
+
+    def current_seq(self, slot: int) -> int:
+        return _SLOT.unpack_from(self.shm.buf, self.slot_offset(slot))[0]
+
+    def view(self, ref: FrameRef) -> np.ndarray:
+        """Zero-copy view of a frame; call verify() once done reading it"""
+        self.verify(ref)
+        return np.ndarray(ref.shape, np.uint8, self.shm.buf, self.slot_offset(ref.slot) + _SLOT.size)
+
+    def verify(self, ref: FrameRef) -> None:
+        """Raise if the slot no longer holds the referenced frame"""
+        if ref.ring_id != self.ring_id:
+            raise FrameOverwrittenError(f"Frame {ref.seq} belongs to an earlier incarnation of ring {ref.ring}")
+        seq = self.current_seq(ref.slot)
+        if seq != ref.seq:
+            raise FrameOverwrittenError(f"Slot {ref.slot} holds frame {seq}, expected {ref.seq}")
+
+    def close(self) -> None:
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
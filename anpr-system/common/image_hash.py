@@ -0,0 +1,11 @@
+import cv2
+import numpy as np
+
+def perceptual_hash(image: np.ndarray, size: int = 16) -> int:
+    """Difference hash of a BGR image: one bit per horizontally adjacent pair of grid cells"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    cells = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(cells[:, 1:] > cells[:, :-1]).tobytes(), "big")
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
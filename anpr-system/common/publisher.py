@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set
+from dataclasses import dataclass
+from aio_pika import Message, Connection, Channel, Exchange
+
+logger = logging.getLogger("publisher")
+
+PUBLISH_MAX_IN_FLIGHT = int(os.getenv("PUBLISH_MAX_IN_FLIGHT", "256"))
+PUBLISH_BUFFER_SIZE = int(os.getenv("PUBLISH_BUFFER_SIZE", "10000"))
+PUBLISH_TIMEOUT = float(os.getenv("PUBLISH_TIMEOUT", "10"))
+PUBLISH_RETRY_DELAY = float(os.getenv("PUBLISH_RETRY_DELAY", "1"))
+PUBLISH_REPORT_INTERVAL = float(os.getenv("PUBLISH_REPORT_INTERVAL", "60"))
+
+@dataclass
+class PendingMessage:
+    message: Message
+    routing_key: str
+    exchange: Optional[str] = None  # None for the default exchange
+    on_confirm: Optional[Callable[[], None]] = None  # Called once the broker has confirmed the message
+    attempts: int = 0
+
+class ConfirmingPublisher:
+    """Pipelined publisher with broker confirms and a local replay buffer
+
+    publish() only waits for room in the local buffer. A background task
+    sends buffered messages on a confirm-mode channel with at most
+    max_in_flight unconfirmed at a time; messages that fail or are nacked
+    are put back into the buffer and resent once the robust connection has
+    recovered, instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int = PUBLISH_MAX_IN_FLIGHT,
+        buffer_size: int = PUBLISH_BUFFER_SIZE
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.buffer_size = buffer_size
+        self.channel: Optional[Channel] = None
+        self.exchanges: Dict[str, Exchange] = {}
+        self.buffer: Optional[asyncio.Queue] = None
+        self.in_flight: Optional[asyncio.Semaphore] = None
+        self.tasks = []
+        self.sending: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.total_published = 0
+        self.total_failed_attempts = 0
+        self.latencies: Deque[float] = deque(maxlen=4096)
+
+    async def start(self, connection: Connection) -> None:
+        """Open a confirm-mode channel; safe to call again after reconnecting"""
+        self.channel = await connection.channel(publisher_confirms=True)
+        self.exchanges = {}
+        if not self.tasks:
+            self.buffer = asyncio.Queue(maxsize=self.buffer_size)
+            self.in_flight = asyncio.Semaphore(self.max_in_flight)
+            self.tasks = [
+                asyncio.create_task(self.send_loop()),
+                asyncio.create_task(self.report_loop())
+            ]
+
+    async def publish(self, message: Message, routing_key: str, exchange: Optional[str] = None,
+                      on_confirm: Optional[Callable[[], None]] = None) -> None:
+        """Buffer a message for publishing, waiting only if the buffer is full"""
+        if self.buffer is None:
+            raise RuntimeError(f"Publisher {self.name} has not been started")
+        await self.buffer.put(PendingMessage(message, routing_key, exchange, on_confirm))
+
+    async def get_exchange(self, name: Optional[str]) -> Exchange:
+        """Exchange by name on the confirm channel; it must already be declared"""
+        if name is None:
+            return self.channel.default_exchange
+        if name not in self.exchanges:
+            self.exchanges[name] = await self.channel.get_exchange(name)
+        return self.exchanges[name]
+
+    async def send_loop(self) -> None:
+        while True:
+            await self.in_flight.acquire()
+            pending = await self.buffer.get()
+            task = asyncio.create_task(self.send(pending))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+
+    async def send(self, pending: PendingMessage) -> None:
+        """Publish one message and wait for its confirm"""
+        start = time.perf_counter()
+        try:
+            pending.attempts += 1
+            exchange = await self.get_exchange(pending.exchange)
+            await exchange.publish(
+                pending.message,
+                routing_key=pending.routing_key,
+                timeout=PUBLISH_TIMEOUT
+            )
+            self.latencies.append(time.perf_counter() - start)
+            self.total_published += 1
+        except Exception as e:
+            self.total_failed_attempts += 1
+            logger.warning(
+                f"[{self.name}] Publish to {pending.routing_key} failed "
+                f"(attempt {pending.attempts}), will replay: {str(e)}"
+            )
+            # Free the in-flight slot before waiting so the sender keeps draining the buffer
+            self.in_flight.release()
+            await asyncio.sleep(min(30, PUBLISH_RETRY_DELAY * 2 ** (pending.attempts - 1)))
+            await self.buffer.put(pending)
+            return
+        finally:
+            self.buffer.task_done()
+        self.in_flight.release()
+        if pending.on_confirm:
+            pending.on_confirm()
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """Publish-to-confirm latency percentiles in milliseconds"""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        return {
+            f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+            for p in (50, 95, 99)
+        }
+
+    async def report_loop(self) -> None:
+        while True:
+            await asyncio.sleep(PUBLISH_REPORT_INTERVAL)
+            percentiles = ", ".join(f"{k}={v:.1f}ms" for k, v in self.latency_percentiles().items())
+            logger.info(
+                f"[{self.name}] {self.total_published} published, "
+                f"{self.total_failed_attempts} failed attempts, "
+                f"{self.buffer.qsize()} buffered, latency {percentiles or 'n/a'}"
+            )
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Wait briefly for buffered messages to be confirmed, then stop"""
+        if self.buffer is not None:
+            try:
+                await asyncio.wait_for(self.buffer.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[{self.name}] Closing with {self.buffer.qsize()} unconfirmed messages")
+        for task in [*self.tasks, *self.sending]:
+            task.cancel()
+        self.tasks = []
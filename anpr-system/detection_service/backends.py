@@ -0,0 +1,218 @@
+import os
+import glob
+import logging
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from preprocessing import Letterboxer, scale_boxes
+
+logger = logging.getLogger("detection_service")
+
+# Detector output shared by every backend: one float32 array per frame with
+# rows of (x1, y1, x2, y2, score, class_id) in source frame pixel coordinates,
+# i.e. the layout of ultralytics' results.boxes.data.
+DETECTION_COLUMNS = 6
+
+# Defaults of ultralytics' predictor, so exported graphs give the same boxes
+NMS_CONFIDENCE = 0.25
+NMS_IOU = 0.7
+MAX_DETECTIONS = 300
+
+class BackendError(Exception):
+    """Raised when a detector backend cannot be loaded or run"""
+    pass
+
+class DetectorBackend:
+    """Runs a detector on a batch of BGR frames of any size
+
+    Frames are letterboxed into a preallocated input tensor that is reused
+    between calls, so predict() must only be called from one thread.
+    """
+
+    name = "base"
+
+    def __init__(self, imgsz: Tuple[int, int]):
+        self.imgsz = imgsz
+        self.letterboxer = Letterboxer(imgsz)
+
+    def infer(self, tensor: np.ndarray) -> List[np.ndarray]:
+        """Run the model on an RGB NCHW float batch, returning rows in input tensor coordinates"""
+        raise NotImplementedError
+
+    def predict(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        tensor, params = self.letterboxer.prepare(frames)
+        return [scale_boxes(rows, p) for rows, p in zip(self.infer(tensor), params)]
+
+    def warmup(self) -> None:
+        self.predict([np.zeros((*self.imgsz, 3), dtype=np.uint8)])
+
+class TorchBackend(DetectorBackend):
+    """ultralytics YOLO on PyTorch, on GPU or CPU"""
+
+    name = "torch"
+
+    def __init__(self, model_path: str, device: str, imgsz: Tuple[int, int]):
+        import torch
+        from ultralytics import YOLO
+
+        super().__init__(imgsz)
+        self.torch = torch
+        self.device = device
+        self.model = YOLO(model_path)
+        self.model.to(device)
+
+    def infer(self, tensor: np.ndarray) -> List[np.ndarray]:
+        # A tensor input skips ultralytics' own letterbox and normalization,
+        # so boxes come back in input tensor coordinates
+        batch = self.torch.from_numpy(tensor).to(self.device, non_blocking=True)
+        results = self.model(batch, verbose=False)
+        return [result.boxes.data.cpu().numpy().astype(np.float32) for result in results]
+
+class OnnxBackend(DetectorBackend):
+    """Exported YOLOv8 graph on ONNX Runtime's CPU execution provider"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, threads: int = 0, int8: bool = False,
+                 calibration_dir: Optional[str] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise BackendError("onnxruntime is required for the ONNX backend")
+
+        if int8:
+            model_path = quantize_int8(model_path, calibration_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[2:4]
+        # Dynamic axes come through as strings; fall back to the export default
+        super().__init__((
+            height if isinstance(height, int) else 640,
+            width if isinstance(width, int) else 640
+        ))
+        self.fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        logger.info(f"Loaded ONNX model {model_path} with input {self.imgsz} (int8: {int8})")
+
+    def run(self, tensors: np.ndarray) -> np.ndarray:
+        if self.fixed_batch is None:
+            return self.session.run(None, {self.input_name: tensors})[0]
+        # Static batch graphs are run in chunks of their exported batch size
+        outputs = []
+        for i in range(0, len(tensors), self.fixed_batch):
+            chunk = tensors[i:i + self.fixed_batch]
+            padding = self.fixed_batch - len(chunk)
+            if padding:
+                chunk = np.concatenate([chunk, np.zeros((padding, *chunk.shape[1:]), chunk.dtype)])
+            outputs.append(self.session.run(None, {self.input_name: chunk})[0][:self.fixed_batch - padding])
+        return np.concatenate(outputs)
+
+    def infer(self, tensor: np.ndarray) -> List[np.ndarray]:
+        return [postprocess(output) for output in self.run(tensor)]
+
+def postprocess(output: np.ndarray) -> np.ndarray:
+    """Decode one raw YOLOv8 head output (4 + classes, anchors) into detection rows"""
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+    keep = scores > NMS_CONFIDENCE
+    boxes, scores, class_ids = predictions[keep, :4], scores[keep], class_ids[keep]
+    if not len(scores):
+        return np.zeros((0, DETECTION_COLUMNS), dtype=np.float32)
+
+    # Center xywh -> corner xyxy
+    xyxy = np.empty_like(boxes)
+    xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:4] / 2
+    xyxy[:, 2:4] = boxes[:, :2] + boxes[:, 2:4] / 2
+
+    # Class-aware NMS, as in ultralytics with agnostic=False
+    xywh = np.concatenate([xyxy[:, :2], xyxy[:, 2:4] - xyxy[:, :2]], axis=1)
+    indices = cv2.dnn.NMSBoxesBatched(
+        xywh.tolist(), scores.tolist(), class_ids.tolist(), NMS_CONFIDENCE, NMS_IOU
+    )
+    indices = np.array(indices, dtype=np.int64).reshape(-1)
+    indices = indices[np.argsort(-scores[indices])][:MAX_DETECTIONS]
+
+    return np.concatenate(
+        [xyxy[indices], scores[indices, None], class_ids[indices, None].astype(np.float32)],
+        axis=1
+    ).astype(np.float32)
+
+def quantize_int8(model_path: str, calibration_dir: Optional[str]) -> str:
+    """Statically quantize an ONNX model to INT8, calibrating on sample frames"""
+    quantized_path = f"{os.path.splitext(model_path)[0]}.int8.onnx"
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    images = sorted(
+        path for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(calibration_dir or "", pattern))
+    )
+    if not images:
+        raise BackendError(f"INT8 quantization needs calibration frames in {calibration_dir}")
+
+    float_backend = OnnxBackend(model_path)
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(images)
+
+        def get_next(self):
+            for path in self.paths:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    tensor, _ = float_backend.letterboxer.prepare([frame])
+                    return {float_backend.input_name: tensor.copy()}
+            return None
+
+    logger.info(f"Quantizing {model_path} to INT8 with {len(images)} calibration frames")
+    # Work files are private to this process and the result only appears
+    # under its final name once complete, so a reader never sees half a model
+    base = f"{os.path.splitext(model_path)[0]}.{os.getpid()}"
+    preprocessed_path = f"{base}.preproc.onnx"
+    partial_path = f"{base}.int8.partial.onnx"
+    try:
+        quant_pre_process(model_path, preprocessed_path)
+        quantize_static(
+            preprocessed_path,
+            partial_path,
+            FrameReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True
+        )
+        os.replace(partial_path, quantized_path)
+    finally:
+        for path in (preprocessed_path, partial_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return quantized_path
+
+def resolve_backend(name: str, model_path: str) -> str:
+    if name == "auto":
+        return "onnx" if model_path.endswith(".onnx") else "torch"
+    return name
+
+def load_backend(name: str, model_path: str, device: str, imgsz: Tuple[int, int] = (640, 640),
+                 threads: int = 0, int8: bool = False,
+                 calibration_dir: Optional[str] = None) -> DetectorBackend:
+    """Pick a backend by name, or by model file extension when name is 'auto'"""
+    name = resolve_backend(name, model_path)
+    if name == "torch":
+        return TorchBackend(model_path, device, imgsz)
+    if name == "onnx":
+        return OnnxBackend(model_path, threads, int8, calibration_dir)
+    raise BackendError(f"Unknown detector backend: {name}")
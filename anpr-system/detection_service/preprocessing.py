@@ -0,0 +1,134 @@
+from typing import List, Optional, Tuple, Union
+from dataclasses import dataclass, field
+import cv2
+import numpy as np
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+LETTERBOX_FILL = 114
+
+# JPEG start-of-frame markers carrying the image dimensions (DHT, JPG and DAC excluded)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_REDUCED_MODES = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+def jpeg_dimensions(data: BytesLike) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG header without decoding it"""
+    view = memoryview(data)
+    if bytes(view[:2]) != b"\xff\xd8":
+        return None
+    offset = 2
+    while offset + 9 <= len(view):
+        if view[offset] != 0xFF:
+            return None
+        marker = view[offset + 1]
+        if marker in _SOF_MARKERS:
+            height = (view[offset + 5] << 8) | view[offset + 6]
+            width = (view[offset + 7] << 8) | view[offset + 8]
+            return width, height
+        offset += 2 + ((view[offset + 2] << 8) | view[offset + 3])
+    return None
+
+@dataclass
+class SourceFrame:
+    """A decoded frame, possibly at reduced resolution, plus the means to get full resolution"""
+    image: np.ndarray  # BGR
+    scale: float = 1.0  # Source pixels per image pixel
+    jpeg: Optional[BytesLike] = field(default=None, repr=False)
+    stream: Optional[str] = None  # Stream URL, for per-stream handling such as tiling
+    _full: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def full_resolution(self) -> np.ndarray:
+        """Full-resolution pixels, decoded on first use (e.g. for plate crops)"""
+        if self.scale == 1.0:
+            return self.image
+        if self._full is None:
+            self._full = cv2.imdecode(np.frombuffer(self.jpeg, np.uint8), cv2.IMREAD_COLOR)
+        return self._full
+
+def decode_for_model(data: BytesLike, input_size: Tuple[int, int]) -> SourceFrame:
+    """Decode a JPEG at the smallest libjpeg reduction that still covers the model input"""
+    buffer = np.frombuffer(data, np.uint8)
+    dimensions = jpeg_dimensions(data)
+    if dimensions:
+        width, height = dimensions
+        # Largest factor that still leaves the letterbox downscaling (or at 1:1)
+        limit = max(height / input_size[0], width / input_size[1])
+        for factor, mode in _REDUCED_MODES:
+            if factor <= limit:
+                image = cv2.imdecode(buffer, mode)
+                if image is not None:
+                    return SourceFrame(image, width / image.shape[1], data)
+                break
+
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Failed to decode frame")
+    return SourceFrame(image)
+
+@dataclass
+class LetterboxParams:
+    ratio: float
+    pad: Tuple[int, int]  # (left, top) offset of the resized frame in the model input
+    shape: Tuple[int, int]  # (height, width) of the frame before letterboxing
+
+class Letterboxer:
+    """Letterboxes BGR frames straight into a reused model input tensor
+
+    Each frame is resized directly into its slot of a preallocated uint8
+    canvas; the uint8 -> float scaling, BGR -> RGB swap and HWC -> CHW
+    transpose then happen in a single pass into a preallocated float32 NCHW
+    tensor. Not thread-safe: use one instance per inference thread.
+    """
+
+    def __init__(self, input_size: Tuple[int, int], capacity: int = 1):
+        self.input_size = input_size
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int) -> None:
+        height, width = self.input_size
+        self.capacity = capacity
+        self.canvas = np.full((capacity, height, width, 3), LETTERBOX_FILL, dtype=np.uint8)
+        self.tensor = np.empty((capacity, 3, height, width), dtype=np.float32)
+        # Placement of the image last drawn into each canvas slot
+        self.geometry: List[Optional[Tuple[int, int, int, int]]] = [None] * capacity
+
+    def prepare(self, frames: List[np.ndarray]) -> Tuple[np.ndarray, List[LetterboxParams]]:
+        """Fill the batch tensor, returning a view of its first len(frames) entries"""
+        if len(frames) > self.capacity:
+            self.allocate(len(frames))
+
+        target_h, target_w = self.input_size
+        params = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            ratio = min(target_h / height, target_w / width)
+            new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+            pad_x, pad_y = (target_w - new_w) / 2, (target_h - new_h) / 2
+            top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+
+            slot = self.canvas[i]
+            if self.geometry[i] != (top, left, new_h, new_w):
+                # Padding only needs repainting when the placement changes
+                slot[...] = LETTERBOX_FILL
+                self.geometry[i] = (top, left, new_h, new_w)
+            cv2.resize(frame, (new_w, new_h), dst=slot[top:top + new_h, left:left + new_w],
+                       interpolation=cv2.INTER_LINEAR)
+            params.append(LetterboxParams(ratio, (left, top), (height, width)))
+
+        n = len(frames)
+        np.multiply(
+            self.canvas[:n, :, :, ::-1].transpose(0, 3, 1, 2),
+            np.float32(1 / 255),
+            out=self.tensor[:n],
+            casting="unsafe"
+        )
+        return self.tensor[:n], params
+
+def scale_boxes(detections: np.ndarray, params: LetterboxParams) -> np.ndarray:
+    """Map (x1, y1, x2, y2, ...) rows from letterbox space back to frame space, in place"""
+    detections[:, [0, 2]] -= params.pad[0]
+    detections[:, [1, 3]] -= params.pad[1]
+    detections[:, :4] /= params.ratio
+    detections[:, [0, 2]] = detections[:, [0, 2]].clip(0, params.shape[1])
+    detections[:, [1, 3]] = detections[:, [1, 3]].clip(0, params.shape[0])
+    return detections
@@ -0,0 +1,31 @@
+from typing import List, Tuple
+import cv2
+import numpy as np
+
+def tile_grid(height: int, width: int, tile: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """Overlapping (x, y, w, h) tiles covering a frame, the last row/column flush with its edges"""
+    stride = max(1, int(tile * (1 - overlap)))
+
+    def starts(length: int) -> List[int]:
+        if length <= tile:
+            return [0]
+        positions = list(range(0, length - tile, stride))
+        positions.append(length - tile)
+        return positions
+
+    return [
+        (x, y, min(tile, width), min(tile, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+def merge_indices(rows: np.ndarray, iou: float) -> np.ndarray:
+    """Class-aware NMS over detections gathered from a frame and its tiles; returns kept row indices"""
+    if len(rows) < 2:
+        return np.arange(len(rows))
+    xywh = np.concatenate([rows[:, :2], rows[:, 2:4] - rows[:, :2]], axis=1)
+    indices = cv2.dnn.NMSBoxesBatched(
+        xywh.tolist(), rows[:, 4].tolist(), rows[:, 5].astype(np.int64).tolist(), 0.0, iou
+    )
+    indices = np.array(indices, dtype=np.int64).reshape(-1)
+    return indices[np.argsort(-rows[indices, 4])]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the service the way it runs in its container: main.py at the
+# top level, next to the shared common package
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVICE_DIR, os.path.dirname(SERVICE_DIR)]
@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+import pytest
+import main
+from main import CropRejectedError, OCRService, PlateTrack
+
+@pytest.fixture
+def service():
+    return OCRService()
+
+def test_consensus_without_reads(service):
+    assert service.consensus([]) is None
+
+def test_consensus_needs_two_reads_of_one_length(service):
+    assert service.consensus([("AB123CD", 0.5)]) is None
+    assert service.consensus([("AB123CD", 0.5), ("AB123", 0.5)]) is None
+
+def test_consensus_votes_per_character(service):
+    reads = [("AB123CD", 0.5), ("A8123CD", 0.45), ("AB123CO", 0.5), ("AB123CD", 0.55)]
+    text, confidence = service.consensus(reads)
+    assert text == "AB123CD"
+    assert 0 < confidence < 1
+
+def test_consensus_normalizes_case_and_spaces(service):
+    text, _ = service.consensus([("ab 123 cd", 0.6), ("AB123CD", 0.6)])
+    assert text == "AB123CD"
+
+def test_agreeing_reads_do_not_raise_confidence(service):
+    # Repeated reads of one plate are correlated, so a repeated misread must not become confident
+    assert service.consensus([("AB123CD", 0.35)] * 3) == ("AB123CD", 0.35)
+    _, confidence = service.consensus([("AB123CD", 0.5), ("AB123CD", 0.7), ("AB123CO", 0.6)])
+    assert confidence < 0.7
+
+def test_resolve_read_without_read_on_new_track(service):
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    assert service.resolve_read(track, None, 0) is None
+    assert track.reads == []
+    assert track.plate is None
+
+def test_resolve_read_accepts_confident_valid_read(service):
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    assert service.resolve_read(track, ("AB123CD", 0.95), 42) == ("AB123CD", 0.95)
+    assert track.plate == ("AB123CD", 0.95)
+    assert track.stable_hash == 42
+
+def test_resolve_read_rejects_invalid_format(service):
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    assert service.resolve_read(track, ("HELLO", 0.95), 0) is None
+    assert track.plate is None
+
+MISREADS = [("A8123CD", 0.9), ("AB123C0", 0.9), ("AB123CD", 0.5), ("AB123CD", 0.5)]
+
+def test_resolve_read_falls_back_to_consensus(service):
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    results = [service.resolve_read(track, read, 0) for read in MISREADS]
+    assert results[:3] == [None, None, None]
+    assert results[3][0] == "AB123CD"
+    assert service.consensus_reads == 1
+
+def test_consensus_never_makes_a_track_stable(service, monkeypatch):
+    monkeypatch.setattr(main, "STABLE_CONFIDENCE", 0.6)
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    for read in MISREADS:
+        accepted = service.resolve_read(track, read, 0)
+    assert accepted[1] >= main.STABLE_CONFIDENCE
+    assert track.plate is None
+
+def test_low_confidence_repeats_are_not_accepted(service):
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    results = [service.resolve_read(track, ("AB123CD", 0.35), 0) for _ in range(5)]
+    assert results == [None] * 5
+    assert track.plate is None
+
+def test_resolve_read_keeps_recent_reads_only(service):
+    track = PlateTrack([0, 0, 100, 30], 0.0)
+    for _ in range(main.PLATE_TRACK_MAX_READS + 5):
+        service.resolve_read(track, ("XX", 0.1), 0)
+    assert len(track.reads) == main.PLATE_TRACK_MAX_READS
+
+def test_stable_read_is_reused_for_a_similar_crop(service):
+    track = service.match_track("cam", [0, 0, 100, 30], 0b1011)
+    service.resolve_read(track, ("AB123CD", 0.95), 0b1011)
+    again = service.match_track("cam", [5, 0, 105, 30], 0b1001)
+    assert again is track
+    assert again.plate == ("AB123CD", 0.95)
+
+def test_stable_read_is_dropped_for_a_different_crop(service):
+    track = service.match_track("cam", [0, 0, 100, 30], 0)
+    service.resolve_read(track, ("AB123CD", 0.95), 0)
+    # Another vehicle stopping in the same spot
+    again = service.match_track("cam", [0, 0, 100, 30], (1 << 64) - 1)
+    assert again is track
+    assert again.plate is None and again.reads == []
+
+def test_stable_read_is_reverified_after_max_crops(service):
+    track = service.match_track("cam", [0, 0, 100, 30], 0)
+    service.resolve_read(track, ("AB123CD", 0.95), 0)
+    track.reused_crops = main.STABLE_MAX_CROPS
+    again = service.match_track("cam", [5, 0, 105, 30], 0)
+    assert again is track
+    assert again.plate is None and again.reads == []
+
+def test_stable_read_expires(service, monkeypatch):
+    track = service.match_track("cam", [0, 0, 100, 30], 0)
+    service.resolve_read(track, ("AB123CD", 0.95), 0)
+    monkeypatch.setattr(main, "STABLE_TTL", -1.0)
+    assert service.match_track("cam", [0, 0, 100, 30], 0).plate is None
+
+def test_rejected_crop_is_gated_before_tracking(service):
+    tiny = cv2.imencode(".png", np.full((4, 16, 3), 128, np.uint8))[1].tobytes().hex()
+    with pytest.raises(CropRejectedError):
+        service.inspect_crop(tiny)
+    assert service.rejections["too_small"] == 1
+    assert not service.plate_tracks